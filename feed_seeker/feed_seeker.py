@@ -2,32 +2,207 @@
 
 See https://github.com/dfm/feedfinder2 for other approaches to the same task.
 """
-from contextlib import contextmanager
-import signal
-from urllib.parse import urljoin, urlparse, urlunparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import heapq
+import itertools
+from io import BytesIO
+import re
+from urllib.parse import urljoin, urlparse, urlsplit, urlunparse, urlunsplit
 from typing import Iterable
 from bs4 import BeautifulSoup
+from lxml import etree
 import requests
-import sys
+import threading
 from requests.adapters import HTTPAdapter
-from requests.exceptions import InvalidSchema, RetryError
+from requests.exceptions import (ChunkedEncodingError, ContentDecodingError, InvalidSchema,
+                                 RetryError)
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 from urllib3.util.retry import Retry
 import publicsuffix
 import time
 
-@contextmanager
-def timeout(seconds=None):
-    """Context manager for handling timeouts"""
-    if seconds:
-        def handler(signum, frame):
-            """Handle signal timer"""
-            raise TimeoutError('Timeout reached ({}s)'.format(seconds))
-        old = signal.signal(signal.SIGALRM, handler)
-        signal.setitimer(signal.ITIMER_REAL, seconds)
-    yield
-    if seconds:
-        signal.setitimer(signal.ITIMER_REAL, 0)
-        signal.signal(signal.SIGALRM, old)
+# Shared across all fetches, so that repeated requests to the same host reuse
+# keep-alive connections rather than paying for a new TCP/TLS handshake each time.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=64,
+                       max_retries=Retry(total=5, backoff_factor=0.1,
+                                         status_forcelist=[500, 502, 503, 504]))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+# For requests that must end by a deadline, since each retry gets the whole timeout again
+_NO_RETRY_SESSION = requests.Session()
+_NO_RETRY_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+_NO_RETRY_SESSION.mount('http://', _NO_RETRY_ADAPTER)
+_NO_RETRY_SESSION.mount('https://', _NO_RETRY_ADAPTER)
+
+# (connect, read) timeout in seconds for a single request
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Most bytes read from a single response. Feed links are near the top of a page, and this
+# stops huge pages and media files that happen to look like feed urls from being downloaded.
+MAX_BYTES = 2 * 1024 * 1024
+
+# Checked against every href on a page, so each is a single case-insensitive scan
+_FEED_ENDING_RE = re.compile(r'\.(?:rss|rdf|atom|xml)\Z', re.IGNORECASE)
+_FEED_SUBSTRING_RE = re.compile(r'rss|rdf|atom|xml|feed', re.IGNORECASE)
+
+# Feeds and web pages can almost always be told apart by their first tag, which comes after
+# at most an xml declaration, a doctype and some comments
+_SNIFF_BYTES = 2048
+_FIRST_TAG_RE = re.compile(rb'(?:\s|<\?.*?\?>|<!--.*?-->|<!doctype[^>]*>)*<([a-z][a-z0-9:]*)',
+                           re.IGNORECASE | re.DOTALL)
+_HEAD_TAG_RE = re.compile(rb'<head[\s/>]', re.IGNORECASE)
+_FEED_TAGS = frozenset((b'rss', b'rdf', b'feed'))
+_PAGE_TAGS = frozenset((b'html', b'head'))
+
+# The charset parameter of a Content-Type header
+_CHARSET_RE = re.compile(r';\s*charset\s*=\s*["\']?([^"\';\s]+)', re.IGNORECASE)
+
+# XPath queries are compiled once, at import, rather than on every call.
+# The html parser keeps namespace prefixes in tag names, as in the <rdf:RDF> root of RSS 1.0
+_FEED_TREE_XPATH = etree.XPath('boolean(//*[{}])'.format(' or '.join(
+    'name()="{0}" or substring-after(name(), ":")="{0}"'.format(tag.decode())
+    for tag in sorted(_FEED_TAGS))))
+_ANCHOR_HREFS_XPATH = etree.XPath('//a/@href', smart_strings=False)
+
+# <link> types that point at feeds
+_FEED_LINK_TYPES = frozenset((
+    "application/rss+xml",
+    "text/xml",
+    "application/atom+xml",
+    "application/x.atom+xml",
+    "application/x-atom+xml",
+))
+_FEED_LINK_XPATH = etree.XPath('//link[{}]/@href'.format(
+    ' or '.join('@type="{}"'.format(link_type) for link_type in sorted(_FEED_LINK_TYPES))),
+    smart_strings=False)
+
+# Common feed locations, relative to a page, that `FeedSeeker.guess_feed_links` tries
+_FEED_SUFFIXES = (
+    # Generic suffixes
+    'index.xml', 'atom.xml', 'feeds', 'feeds/default', 'feed', 'feed/default',
+    'feeds/posts/default/', '?feed=rss', '?feed=atom', '?feed=rss2', '?feed=rdf', 'rss',
+    'atom', 'rdf', 'index.rss', 'index.rdf', 'index.atom',
+    '?type=100',  # Typo3 RSS URL
+    '?format=feed&type=rss',  # Joomla RSS URL
+    'feeds/posts/default',  # Blogger.com RSS URL
+    'data/rss',  # LiveJournal RSS URL
+    'rss.xml',  # Posterous.com RSS feed
+    'articles.rss', 'articles.atom',  # Patch.com RSS feeds
+)
+
+# Content types that are only ever used for feeds
+_FEED_CONTENT_TYPES = frozenset(('application/rss+xml', 'application/atom+xml'))
+
+# Content type prefixes that are never used for feeds. Feeds are often served as text/html
+# or text/plain, so only binary types are ruled out.
+_NON_FEED_CONTENT_TYPES = ('image/', 'audio/', 'video/', 'font/', 'application/pdf',
+                           'application/zip')
+
+# Most guessed feed locations do not exist, so their HEAD requests are sent all at once
+_MAX_HEAD_WORKERS = 8
+
+# lxml parsers can be reused, but not by two threads at once, so each thread keeps its own
+_PARSERS = threading.local()
+
+# Downloaded and parsed on first use by `_public_suffix_list`
+_PUBLIC_SUFFIX_LIST = None
+
+
+def _deadline(max_time):
+    """Convert a time limit in seconds into a deadline for `_check_deadline`, or None"""
+    if max_time is None:
+        return None
+    return time.monotonic() + max_time
+
+
+def _check_deadline(deadline):
+    """Raise a TimeoutError if the deadline, from `_deadline`, has passed
+
+    Deadlines are checked between requests rather than enforced with a signal, so that they
+    work from any thread and alongside concurrent fetching. Requests made with the default
+    functions also end by the deadline, with the arguments from `_request_kwargs` and by
+    reading their bodies through `_iter_body`.
+    """
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError('Timeout reached')
+
+
+def _request_kwargs(deadline):
+    """Keyword arguments for the default request functions, so that they end by a deadline
+
+    Parameters
+    ----------
+    deadline : float or None
+        `time.monotonic` time, from `_deadline`, by which the request should end
+
+    Returns
+    -------
+    dict
+        A timeout no longer than the time left, and no retries. Empty without a deadline.
+    """
+    if deadline is None:
+        return {}
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('Timeout reached')
+    return {
+        'timeout': tuple(min(limit, remaining) for limit in DEFAULT_TIMEOUT),
+        'retries': False,
+    }
+
+
+def _map_ahead(function, items, max_workers=1):
+    """Like `map`, but running `function` on up to `max_workers` items at once in threads
+
+    Results are produced in the same order as `items`, and items are only pulled from
+    `items` as workers become free, so that a caller that stops early wastes little work.
+
+    Parameters
+    ----------
+    function : function
+        Called with each item, from a worker thread if `max_workers` is larger than 1
+    items : iterable
+        Arguments for `function`
+    max_workers : int (optional)
+        How many calls to run at once. Defaults to 1, for calling `function` in this thread.
+
+    Yields
+    ------
+        the result of `function` for each item
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _public_suffix_list():
+    """The public suffix list, fetched and parsed once per process
+
+    Returns
+    -------
+    publicsuffix.PublicSuffixList
+    """
+    global _PUBLIC_SUFFIX_LIST
+    if _PUBLIC_SUFFIX_LIST is None:
+        _PUBLIC_SUFFIX_LIST = publicsuffix.PublicSuffixList(publicsuffix.fetch())
+    return _PUBLIC_SUFFIX_LIST
 
 
 def _is_feed_url(url):
@@ -45,14 +220,7 @@ def _is_feed_url(url):
     boolean
         True if the string is a feed with high probability, or else False
     """
-    endings = (
-        '.rss',
-        '.rdf',
-        '.atom',
-        '.xml',
-    )
-    url_lower = url.lower()
-    return any(url_lower.endswith(ending) for ending in endings)
+    return _FEED_ENDING_RE.search(url) is not None
 
 
 def _might_be_feed_url(url):
@@ -69,50 +237,371 @@ def _might_be_feed_url(url):
     boolean
         True if the string is a feed with reasonable probability, or else False
     """
-    substrings = (
-        'rss',
-        'rdf',
-        'atom',
-        'xml',
-        'feed'
-    )
-    url_lower = url.lower()
-    return any(substring in url_lower for substring in substrings)
+    return _FEED_SUBSTRING_RE.search(url) is not None
+
+
+def _parse_html(html):
+    """Parse html into an lxml tree, the same way the `lxml` BeautifulSoup builder does
+
+    The parsers are made once per thread, rather than once per document.
+
+    Parameters
+    ----------
+    html : str or bytes
+        Html (or xml) of a web page
+
+    Returns
+    -------
+    lxml.etree._Element
+        Root of the parsed document. An empty document gives an empty <html> element.
+    """
+    try:
+        parser, utf8_parser = _PARSERS.html
+    except AttributeError:
+        parser, utf8_parser = _PARSERS.html = etree.HTMLParser(), etree.HTMLParser(encoding='utf-8')
+    if isinstance(html, str):
+        # lxml refuses str input that carries an xml encoding declaration
+        root = etree.fromstring(html.encode('utf-8'), utf8_parser)
+    else:
+        root = etree.fromstring(html, parser)
+    if root is None:
+        root = etree.Element('html')
+    return root
+
+
+def _decode_content(content, content_type):
+    """Decode a response body with the charset from its Content-Type header, if it has one
+
+    The header takes precedence over an encoding declared in the document, as in browsers.
+
+    Parameters
+    ----------
+    content : bytes
+        Body of a response
+    content_type : str or None
+        Content-Type header of the response
+
+    Returns
+    -------
+    str or bytes
+        The decoded body, or the bytes unchanged if the header gives no known charset
+    """
+    match = _CHARSET_RE.search(content_type or '')
+    if match is None:
+        return content
+    try:
+        # a body cut off at `max_bytes` may end part way through a character
+        return content.decode(match.group(1), errors='replace')
+    except LookupError:     # unknown charset
+        return content
+
+
+def _tag_is_feed(tag):
+    """Check if a document is a feed from the tag of its root element, as parsed by lxml
+
+    Namespaces are ignored, whether parsed (`{uri}RDF`) or kept as a prefix (`rdf:rdf`).
+
+    Returns
+    -------
+    boolean or None
+        True for a feed tag, False for an html one, or else None
+    """
+    if not isinstance(tag, str):    # comments and processing instructions
+        return None
+    tag = tag.rpartition('}')[2].rpartition(':')[2].lower().encode('utf-8')
+    if tag in _PAGE_TAGS:
+        return False
+    if tag in _FEED_TAGS:
+        return True
+    return None
+
 
+def _root_is_feed(html):
+    """Check if a document is a feed from its root element, parsing no further than that
 
-def default_fetch_function(url):
-    """Default function to fetch text from url
+    Handles documents whose first tag is too far in for `_sniff_is_feed`, such as ones
+    starting with a long comment.
+
+    Parameters
+    ----------
+    html : str or bytes
+        Html (or xml) of a web page
+
+    Returns
+    -------
+    boolean or None
+        True for a feed root element, False for an html one, or else None
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    try:
+        for _, element in etree.iterparse(BytesIO(html), events=('start',), recover=True):
+            return _tag_is_feed(element.tag)
+    except etree.XMLSyntaxError:
+        pass
+    return None
+
+
+def _sniff_is_feed(html):
+    """Check if a document is a feed from its first tag, without parsing it
+
+    Parameters
+    ----------
+    html : str or bytes
+        Html (or xml) of a web page
+
+    Returns
+    -------
+    boolean or None
+        True for documents starting with a feed tag, False for ones starting with an html
+        tag, or None if the start of the document is not conclusive
+    """
+    prefix = html[:_SNIFF_BYTES]
+    if isinstance(prefix, str):
+        prefix = prefix.encode('utf-8')
+    match = _FIRST_TAG_RE.match(prefix.lstrip(b'\xef\xbb\xbf'))
+    if match is None:
+        if len(html) > _SNIFF_BYTES:
+            return _root_is_feed(html)
+        return None
+    tag = match.group(1).lower().rpartition(b':')[2]
+    if tag in _PAGE_TAGS:
+        return False
+    if tag in _FEED_TAGS and _HEAD_TAG_RE.search(prefix) is None:
+        return True
+    return None
+
+
+def _iter_body(response, chunk_size, deadline=None):
+    """Iterate over the body of a streamed response, giving up at the deadline
+
+    The read timeout only applies to each read from the socket, so a server sending its body
+    slowly could otherwise keep a download going long past the deadline. With a deadline,
+    each read returns whatever has arrived rather than waiting for a whole chunk, and the
+    deadline is checked between reads.
+
+    Parameters
+    ----------
+    response : requests.Response
+        A response made with `stream=True`
+    chunk_size : int
+        Most (decompressed) bytes to read at once
+    deadline : float (optional)
+        `time.monotonic` time after which to raise a TimeoutError
+
+    Yields
+    ------
+        bytes of the body
+    """
+    if deadline is None:
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    while True:
+        _check_deadline(deadline)
+        try:
+            chunk = response.raw.read1(chunk_size, decode_content=True)
+        except Urllib3HTTPError as error:    # as `iter_content` does for timeouts
+            raise requests.ConnectionError(error)
+        if not chunk:
+            return
+        yield chunk
+
+
+def default_fetch_function(url, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_BYTES, retries=True,
+                           deadline=None):
+    """Default function to fetch the content of a url
 
     There are some strong choices on how to handle errors in `FeedSeeker`. Use this function
     as an example of how to make a new fetch function. Note that the function may be used
     to attempt to fetch urls that do not exist, so be thoughtful about what exceptions to throw!
 
+    Pages are decoded with the charset from their Content-Type header, when it has one.
+    Otherwise the raw bytes are returned, and the parser reads the encoding from the document
+    itself (a <meta charset> or xml declaration). Custom fetch functions may return either
+    bytes or str.
+
     Parameters
     ----------
     url : string
         A url for a webpage
+    timeout : float or tuple (optional)
+        Passed on to `requests`, as either a single timeout or a (connect, read) pair
+    max_bytes : int (optional)
+        Stop reading the response after this many (decompressed) bytes
+    retries : bool (optional)
+        Whether to retry connection errors and server errors. Defaults to True.
+    deadline : float (optional)
+        `time.monotonic` time after which to stop reading and raise a TimeoutError
 
     Returns
     ------
-    str
-        Text of the html from the url
+    str or bytes
+        Content of the html from the url
     """
+    try:
+        session = _SESSION if retries else _NO_RETRY_SESSION
+        with session.get(url, timeout=timeout, stream=True) as response:
+            # error pages are read too, so that the connection can go back to the pool
+            content = bytearray()
+            for chunk in _iter_body(response, 64 * 1024, deadline=deadline):
+                content += chunk
+                if len(content) >= max_bytes:
+                    break
+            if response.ok:
+                return _decode_content(bytes(content[:max_bytes]),
+                                       response.headers.get('Content-Type'))
+            else:
+                return b''
+
+    # ConnectionError for 404s, InvalidSchema for email addresses, requests.TooManyRedirects
+    # for issues with a url giving too many redirect loops, and requests.Timeout for
+    # servers that are too slow to respond. ChunkedEncodingError and ContentDecodingError
+    # are for bodies that are cut off or corrupt.
+    except (requests.ConnectionError, InvalidSchema, RetryError, requests.TooManyRedirects,
+            requests.Timeout, ChunkedEncodingError, ContentDecodingError):
+        return b''
+
+
+def default_fetch_and_probe(url, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_BYTES, retries=True,
+                            deadline=None):
+    """Fetch a url, but stop reading as soon as its root element shows whether it is a feed
 
-    session = requests.Session()
+    The body is fed to an incremental parser as it arrives, so that for most pages and
+    feeds only the first chunk is downloaded. Errors are handled like in
+    `default_fetch_function`.
 
-    retries = Retry(total=5, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
-    session.mount(url, HTTPAdapter(max_retries=retries))
+    Parameters
+    ----------
+    url : string
+        A url for a webpage
+    timeout : float or tuple (optional)
+        Passed on to `requests`, as either a single timeout or a (connect, read) pair
+    max_bytes : int (optional)
+        Stop reading the response after this many (decompressed) bytes
+    retries : bool (optional)
+        Whether to retry connection errors and server errors. Defaults to True.
+    deadline : float (optional)
+        `time.monotonic` time after which to stop reading and raise a TimeoutError
+
+    Returns
+    ------
+    (boolean, None) or (None, str or bytes)
+        Whether the url is a feed, if its root element decides it. Otherwise, the content
+        of the url, as from `default_fetch_function`, for `FeedSeeker.is_feed` to check.
+    """
     try:
-        response = session.get(url)
-        if response.ok:
-            return response.text
-        else:
-            return ''
+        session = _SESSION if retries else _NO_RETRY_SESSION
+        with session.get(url, timeout=timeout, stream=True) as response:
+            if not response.ok:
+                return False, None
+            parser = etree.XMLPullParser(events=('start',), recover=True)
+            content = bytearray()
+            for chunk in _iter_body(response, 4096, deadline=deadline):
+                content += chunk
+                if len(content) >= max_bytes:
+                    break
+                if parser is None:
+                    continue
+                try:
+                    parser.feed(chunk)
+                    events = parser.read_events()
+                    _, root = next(events, (None, None))
+                except etree.XMLSyntaxError:
+                    parser = None
+                    continue
+                if root is None:
+                    continue
+                parser = None
+                is_feed = _tag_is_feed(root.tag)
+                if is_feed is False or (is_feed and _HEAD_TAG_RE.search(content) is None):
+                    # closing the response here skips downloading the rest of it
+                    return is_feed, None
+            return None, _decode_content(bytes(content[:max_bytes]),
+                                         response.headers.get('Content-Type'))
+
+    except (requests.ConnectionError, InvalidSchema, RetryError, requests.TooManyRedirects,
+            requests.Timeout, ChunkedEncodingError, ContentDecodingError):
+        return False, None
+
+
+def _is_missing(head):
+    """Check if the result of a head function shows that a url has nothing to fetch
 
-    # ConnectionError for 404s, InvalidSchema for email addresses, requests.TooManyRedirects
-    # for issues with a url giving too many redirect loops.
-    except (requests.ConnectionError, InvalidSchema, RetryError, requests.TooManyRedirects):
-        return ''
+    Parameters
+    ----------
+    head : (int, str) or None
+        Status code and content type, as returned by `default_head_function`
+
+    Returns
+    -------
+    boolean
+        True for missing pages, or else False. Other errors, such as 501 from servers that do
+        not support HEAD, are left for the page to be fetched.
+    """
+    if head is None:
+        return False
+    status, _ = head
+    return status in (404, 410)
+
+
+def default_head_function(url, timeout=DEFAULT_TIMEOUT, retries=True):
+    """Default function to fetch the status and content type of a url with a HEAD request
+
+    Used to rule out, or accept, candidate feed urls without downloading them. Errors are
+    handled like in `default_fetch_function`, except that None is returned so that the
+    url is fetched normally.
+
+    Parameters
+    ----------
+    url : string
+        A url for a webpage
+    timeout : float or tuple (optional)
+        Passed on to `requests`, as either a single timeout or a (connect, read) pair
+    retries : bool (optional)
+        Whether to retry connection errors and server errors. Defaults to True.
+
+    Returns
+    ------
+    (int, str) or None
+        Status code and lowercased content type (without parameters) of the url
+    """
+    try:
+        session = _SESSION if retries else _NO_RETRY_SESSION
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+    except (requests.ConnectionError, InvalidSchema, RetryError, requests.TooManyRedirects,
+            requests.Timeout):
+        return None
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return response.status_code, content_type
+
+
+def default_json_fetch_function(url, params=None, timeout=DEFAULT_TIMEOUT):
+    """Default function to fetch JSON from an API, used for feedly searches
+
+    Errors are handled like in `default_fetch_function`, except that None is returned.
+
+    Parameters
+    ----------
+    url : string
+        Url of the API endpoint
+    params : dict (optional)
+        Query arguments for the request
+    timeout : float or tuple (optional)
+        Passed on to `requests`, as either a single timeout or a (connect, read) pair
+
+    Returns
+    ------
+    object or None
+        The decoded JSON, or None for errors and responses other than 200
+    """
+    try:
+        response = _SESSION.get(url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        return response.json()
+    except (requests.ConnectionError, InvalidSchema, RetryError, requests.TooManyRedirects,
+            requests.Timeout, ChunkedEncodingError, ContentDecodingError, ValueError):
+        return None
 
 
 class FeedSeeker(object):
@@ -129,7 +618,13 @@ class FeedSeeker(object):
     get a single feed, or to stop iterating over all feeds once a condition is
     satisfied.
     """
-    def __init__(self, url, html=None, fetcher=None):
+    # Spidering creates a seeker per checked url, so keep instances small
+    __slots__ = (
+        'url', 'fetcher', 'head_function', '_clean_url', '_html', '_soup', '_tree', '_is_feed',
+        '_hrefs', '_heads', '_feeds', 'uri_root_domain', 'uri_hostname', 'uri_domain_only',
+    )
+
+    def __init__(self, url, html=None, fetcher=None, head_function=None):
         """Initialization
 
         Parameters
@@ -137,20 +632,33 @@ class FeedSeeker(object):
         url : str
               A url that resolves to the webpage in question
 
-        html : str (optional)
+        html : str or bytes (optional)
               To save a second web fetch, the raw html can be supplied
         fetcher : function (optional)
-              A function that accepts a url and returns text. See `default_fetch_function`
-              for how to write a custom fetcher.
+              A function that accepts a url and returns text or bytes. See
+              `default_fetch_function` for how to write a custom fetcher.
+        head_function : function (optional)
+              A function that accepts a url and returns its status code and content type, or
+              None if unknown. See `default_head_function`. Defaults to `default_head_function`
+              when no `fetcher` is given, and to not making HEAD requests otherwise.
         """
         self.url = url
+        self._clean_url = urlunparse(urlparse(url)._replace(query=''))
         self._html = html
         self._soup = None
+        self._tree = None
+        self._is_feed = None
+        self._hrefs = None
         self.fetcher = fetcher or default_fetch_function
+        if head_function is None and fetcher is None:
+            head_function = default_head_function
+        self.head_function = head_function
+        self._heads = {}        # results of the head function, by url
+        self._feeds = {}        # feeds found so far, and the search for more, by arguments
 
     @property
     def html(self):
-        """String of the html of the underlying site."""
+        """Html of the underlying site, as returned by the fetcher (str or bytes)."""
         if self._html is None:
             self._html = self.fetcher(self.url)
         return self._html
@@ -162,10 +670,64 @@ class FeedSeeker(object):
             self._soup = BeautifulSoup(self.html, 'lxml')
         return self._soup
 
+    @property
+    def tree(self):
+        """lxml representation of the data.
+
+        Used for the feed and link checks, since XPath queries run in C rather than walking
+        the BeautifulSoup object tree in Python.
+        """
+        if self._tree is None:
+            self._tree = _parse_html(self.html)
+        return self._tree
+
+    @property
+    def hrefs(self):
+        """Distinct hrefs of the <a> tags on the page, in order of first appearance.
+
+        Shared by `find_anchor_feeds` and `find_internal_links`, which both scan every anchor.
+        """
+        if self._hrefs is None:
+            # navigation and footers repeat the same links many times
+            self._hrefs = tuple(dict.fromkeys(_ANCHOR_HREFS_XPATH(self.tree)))
+        return self._hrefs
+
     def clean_url(self):
-        """Remove query arguments from a url."""
-        parsed = urlparse(self.url)
-        return urlunparse(parsed._replace(query=''))
+        """Remove query arguments from a url.
+
+        Computed once on initialization, since every found or guessed link is joined to it.
+        """
+        return self._clean_url
+
+    def _fetch_html(self, deadline=None):
+        """Like `html`, but with the default fetcher giving up by the deadline
+
+        Custom fetchers are called as they are, and only checked against the deadline after
+        they return.
+
+        Parameters
+        ----------
+        deadline : float (optional)
+            `time.monotonic` time by which the request should end
+        """
+        if self._html is None and self.fetcher is default_fetch_function:
+            self._html = default_fetch_function(self.url, deadline=deadline,
+                                                **_request_kwargs(deadline))
+        return self.html
+
+    def _head(self, url, deadline=None):
+        """Call the head function on a url, with the default one giving up by the deadline
+
+        Parameters
+        ----------
+        url : str
+            Url to ask for the headers of
+        deadline : float (optional)
+            `time.monotonic` time by which the request should end
+        """
+        if self.head_function is default_head_function:
+            return default_head_function(url, **_request_kwargs(deadline))
+        return self.head_function(url)
 
     def _should_continue(self, seen, max_links):
         """Helper to short-circuit spidering
@@ -185,9 +747,14 @@ class FeedSeeker(object):
             return False
         return True
 
-    def generate_feed_urls(self, spider=0, max_links=None):
+    def generate_feed_urls(self, spider=0, max_links=None, max_time=None, max_workers=1,
+                           verify=True):
         """Generates an iterator of possible feeds, in rough order of likelihood.
 
+        Without a `max_time`, and with a single worker, the feeds found are kept, so that
+        asking again with the same arguments (for example after `find_feed_url`) picks up where
+        the last search stopped rather than fetching everything again.
+
         Parameters
         ----------
         spider : int (optional)
@@ -195,15 +762,185 @@ class FeedSeeker(object):
         max_links : int (optional)
               Maximum links to check as feeds, to limit spidering complexity. Defaults to `None`,
               for unlimited.
+        max_time : float (optional)
+              Give up after a certain amount of time. Requests with the default functions
+              are cut short at it, while custom fetchers are only checked *after* each
+              request returns. Defaults to `None` for unlimited. Throws a TimeoutError when
+              the time is reached
+        max_workers : int (optional)
+              How many candidate urls to fetch at once. Defaults to 1, for fetching one at a
+              time. The fetcher must be thread-safe if this is larger.
+        verify : bool (optional)
+              Whether to fetch urls on the page ending in .rss, .rdf, .atom or .xml to check
+              that they are feeds. Defaults to True. If False, those urls are produced
+              unchecked. Guessed urls are always checked.
 
         Yields
         ------
             urls of possible feeds
         """
-        for url, _ in self._generate_feed_urls(spider=spider, max_links=max_links):
-            yield url
+        kwargs = {
+            'spider': spider,
+            'max_links': max_links,
+            'deadline': _deadline(max_time),
+            'max_workers': max_workers,
+            'verify': verify,
+        }
+        if max_time is not None or max_workers > 1:
+            # a search that may time out can not be picked up again, and one fetching in
+            # threads is closed as soon as the caller stops, so that its workers stop too
+            search = self._generate_feed_urls(**kwargs)
+            try:
+                for url, _ in search:
+                    yield url
+            finally:
+                search.close()
+            return
+
+        key = (spider, max_links, verify)
+        if key not in self._feeds:
+            self._feeds[key] = [], (url for url, _ in self._generate_feed_urls(**kwargs))
+        feeds, search = self._feeds[key]
+        index = 0
+        while True:
+            if index == len(feeds):
+                try:
+                    url = next(search, None)
+                except BaseException:
+                    # a search that raised is finished, so the next call starts over
+                    self._feeds.pop(key, None)
+                    raise
+                if url is None:
+                    return
+                feeds.append(url)
+            yield feeds[index]
+            index += 1
+
+    def _candidate_urls(self, seen, max_links, deadline=None):
+        """Generates not yet seen urls that might be feeds, in rough order of likelihood.
+
+        Each url is added to `seen` as it is produced.
 
-    def _generate_feed_urls(self, spider=0, seen=None, max_links=None):
+        Parameters
+        ----------
+        seen : set
+            List of urls that have already been checked
+        max_links : int or None
+            Maximum number of links to check
+        deadline : float (optional)
+            Passed on to `_live_guess_feed_links`, as is `max_links`
+
+        Yields
+        ------
+            (string, boolean)
+            urls to check as feeds, and whether they were found on the page rather than guessed
+        """
+        url_fns = (
+            (self.find_link_feeds, True),
+            (self.find_anchor_feeds, True),
+            (lambda: self._live_guess_feed_links(seen, deadline=deadline, max_links=max_links),
+             False),
+        )
+        for url_fn, on_page in url_fns:
+            for url in url_fn():
+                if url not in seen:
+                    seen.add(url)
+                    if not self._should_continue(seen, max_links):
+                        return
+                    yield url, on_page
+
+    def _url_is_feed(self, url, seekers=None, verify=True, deadline=None):
+        """Check whether a url is a feed, asking for its headers before fetching it
+
+        Missing pages and media files are ruled out, and urls served with a feed content type
+        are accepted, without downloading them. Anything else is fetched with this seeker's
+        fetcher and parsed. With the default fetcher, the download stops once
+        `default_fetch_and_probe` can tell from the root element, except for pages that may
+        be spidered onto later.
+
+        Parameters
+        ----------
+        url : str
+            Url to check
+        seekers : dict (optional)
+            Given when spidering. Urls on the same host as this page are then read in full,
+            and the seeker used to fetch them is stored in it, by url, so that spidering onto
+            the same url later does not fetch it again.
+        verify : bool (optional)
+            If False, urls that `_is_feed_url` matches are accepted without any request. Only
+            meant for urls found on a page, since guessed urls usually do not exist.
+        deadline : float (optional)
+            `time.monotonic` time by which requests with the default functions should end
+        """
+        if not verify and _is_feed_url(url):
+            return True
+
+        if self.head_function is not None:
+            head = self._heads[url] if url in self._heads else self._head(url, deadline)
+            if _is_missing(head):
+                return False
+            if head is not None and head[0] < 300:
+                if head[1] in _FEED_CONTENT_TYPES:
+                    return True
+                if head[1].startswith(_NON_FEED_CONTENT_TYPES):
+                    return False
+
+        # only pages on the same host are ever spidered onto, so only they are kept
+        spiderable = (seekers is not None and
+                      urlsplit(url).hostname == urlsplit(self.clean_url()).hostname)
+        html = None
+        if not spiderable and self.fetcher is default_fetch_function:
+            is_feed, html = default_fetch_and_probe(url, deadline=deadline,
+                                                    **_request_kwargs(deadline))
+            if is_feed is not None:
+                return is_feed
+
+        cls = type(self)        # get object class (in case subclassed)
+        seeker = cls(url, html=html, fetcher=self.fetcher, head_function=self.head_function)
+        if spiderable:
+            seekers[url] = seeker
+        seeker._fetch_html(deadline)
+        return seeker.is_feed()
+
+    def _check_feeds(self, urls, deadline=None, max_workers=1, seekers=None, verify=True):
+        """Checks urls as feeds, fetching up to `max_workers` of them at once
+
+        Results are produced in the same order as `urls`, so that more likely feeds still
+        come first, and urls are only pulled from `urls` as workers become free.
+
+        Parameters
+        ----------
+        urls : iterable
+            (url, boolean) pairs of urls to check, and whether they were found on the page,
+            as from `_candidate_urls`
+        deadline : float (optional)
+            Raise a TimeoutError after this `time.monotonic` time, and passed on to
+            `_url_is_feed`
+        max_workers : int (optional)
+            How many urls to fetch at once
+        seekers : dict (optional)
+            Passed on to `_url_is_feed`
+        verify : bool (optional)
+            Passed on to `_url_is_feed` for urls found on the page. Guessed urls are always
+            checked.
+
+        Yields
+        ------
+            (string, boolean)
+            each url, and whether it is a feed
+        """
+        url_is_feed = partial(self._url_is_feed, seekers=seekers, deadline=deadline)
+
+        def check(candidate):
+            url, on_page = candidate
+            return url, url_is_feed(url, verify=verify or not on_page)
+
+        for url, is_feed in _map_ahead(check, urls, max_workers=max_workers):
+            _check_deadline(deadline)
+            yield url, is_feed
+
+    def _generate_feed_urls(self, spider=0, seen=None, max_links=None, deadline=None,
+                            max_workers=1, seekers=None, verify=True):
         """Internal function that actually does the work for `generate_feed_urls`
 
         There are some recursive calls keeping track of already seen urls, and it was easier
@@ -218,6 +955,17 @@ class FeedSeeker(object):
         max_links : int (optional)
               Maximum links to check as feeds, to limit spidering complexity. Defaults to `None`,
               for unlimited.
+        deadline : float (optional)
+              `time.monotonic` time after which to throw a TimeoutError
+        max_workers : int (optional)
+              How many candidate urls to fetch at once. Defaults to 1, for fetching one at a
+              time. The fetcher must be thread-safe if this is larger.
+        seekers : dict (optional)
+              Seekers for urls already fetched during this run, by url. Shared with spidered
+              pages so that no url is fetched twice. Only kept when spidering.
+        verify : bool (optional)
+              Whether to fetch urls on the page that look like feeds to check them. Defaults
+              to True.
 
         Yields
         ------
@@ -226,8 +974,12 @@ class FeedSeeker(object):
         """
         if seen is None:
             seen = set()
+        if seekers is None and spider > 0:
+            seekers = {}
 
-        if not self.html:
+        html = self._fetch_html(deadline)
+        _check_deadline(deadline)
+        if not html:
             return
 
         if self.is_feed() and self.url not in seen:
@@ -237,29 +989,48 @@ class FeedSeeker(object):
 
         cls = type(self)        # get object class (in case subclassed)
 
-        for url_fn in (self.find_link_feeds, self.find_anchor_feeds, self.guess_feed_links):
-            for url in url_fn():
-                if url not in seen:
-                    seen.add(url)
-                    if not self._should_continue(seen, max_links):
-                        return
-                    if cls(url, html=None, fetcher=self.fetcher).is_feed():
-                        yield url, seen
+        candidates = self._candidate_urls(seen, max_links, deadline=deadline)
+        for url, is_feed in self._check_feeds(candidates, deadline=deadline,
+                                              max_workers=max_workers, seekers=seekers,
+                                              verify=verify):
+            if is_feed:
+                yield url, seen
+
+        if not self._should_continue(seen, max_links):
+            return
 
         if spider > 0:
-            for internal_link in self.find_internal_links():
-                #print("Internal Link: {}".format(internal_link))
-                #sys.exit()
-                spider_seeker = cls(internal_link, html=None, fetcher=self.fetcher)
+            def fetch(internal_link):
+                spider_seeker = seekers.get(internal_link)
+                if spider_seeker is None:
+                    spider_seeker = cls(internal_link, html=None, fetcher=self.fetcher,
+                                        head_function=self.head_function)
+                spider_seeker._fetch_html(deadline)     # fetch the page ahead of searching it
+                return spider_seeker
+
+            # stop once `max_links` is reached. Pages are fetched ahead, up to `max_workers`
+            # at once, but searched one at a time so that `seen` and the order of feeds stay
+            # the same. Pages that fail or add no new links use none of `max_links`, so every
+            # internal link is ranked.
+            internal_links = itertools.takewhile(lambda _: self._should_continue(seen, max_links),
+                                                 self.find_internal_links())
+            for spider_seeker in _map_ahead(fetch, internal_links, max_workers=max_workers):
+                if not self._should_continue(seen, max_links):
+                    return
                 kwargs = {
                     'spider': spider - 1,
                     'seen': seen,
                     'max_links': max_links,
+                    'deadline': deadline,
+                    'max_workers': max_workers,
+                    'seekers': seekers,
+                    'verify': verify,
                 }
                 for url, seen in spider_seeker._generate_feed_urls(**kwargs):
                     yield url, seen
 
-    def find_feed_url(self, spider=0, max_links=None):
+    def find_feed_url(self, spider=0, max_links=None, max_time=None, max_workers=1,
+                      verify=True):
         """Fine the single most likely url as a feed for the page, or None.
 
         Parameters
@@ -269,6 +1040,18 @@ class FeedSeeker(object):
         max_links : int (optional)
               Maximum links to check as feeds, to limit spidering complexity. Defaults to `None`,
               for unlimited.
+        max_time : float (optional)
+              Give up after a certain amount of time. Requests with the default functions
+              are cut short at it, while custom fetchers are only checked *after* each
+              request returns. Defaults to `None` for unlimited. Throws a TimeoutError when
+              the time is reached
+        max_workers : int (optional)
+              How many candidate urls to fetch at once. Defaults to 1, for fetching one at a
+              time. The fetcher must be thread-safe if this is larger.
+        verify : bool (optional)
+              Whether to fetch urls on the page ending in .rss, .rdf, .atom or .xml to check
+              that they are feeds. Defaults to True. If False, those urls are produced
+              unchecked. Guessed urls are always checked.
 
         Returns
         -------
@@ -277,7 +1060,9 @@ class FeedSeeker(object):
         """
 
         try:
-            return next(self.generate_feed_urls(spider=spider, max_links=max_links))
+            return next(self.generate_feed_urls(spider=spider, max_links=max_links,
+                                                max_time=max_time, max_workers=max_workers,
+                                                verify=verify))
         except StopIteration:
             return None
 
@@ -285,13 +1070,29 @@ class FeedSeeker(object):
         """Check if the site is a feed.
 
         Logic is to make sure there is no <html> tag, and there is some <rss> tag or similar.
+        The result is kept, since spidering may ask again about an already fetched page.
+        Most documents are told apart by their first tag, without being parsed at all.
+        """
+        if self._is_feed is None:
+            is_feed = _sniff_is_feed(self.html)
+            if is_feed is None:
+                is_feed = self._tree_is_feed()
+            self._is_feed = is_feed
+        return self._is_feed
+
+    def _tree_is_feed(self):
+        """The parsing part of `is_feed`, for documents that `_sniff_is_feed` can not decide
+
+        lxml's html parser always builds an <html> root and only ever puts <head> directly
+        under it, so neither check needs to walk the whole tree on the usual documents.
         """
-        invalid_tags = ('head',)
-        if any(self.soup.find(tag) for tag in invalid_tags):
+        tree = self.tree
+        if tree.find('head') is not None:
             return False
-
-        valid_tags = ('rss', 'rdf', 'feed',)
-        return any(self.soup.find(tag) for tag in valid_tags)
+        first = tree.find('body/*')
+        if first is not None and _tag_is_feed(first.tag):
+            return True
+        return _FEED_TREE_XPATH(tree)
 
     def find_link_feeds(self):
         """Uses <link> tags to extract feeds
@@ -299,43 +1100,57 @@ class FeedSeeker(object):
         for example:
             <link type="application/rss+xml" href="/might/be/relative.rss"></link>
         """
-        valid_types = [
-            "application/rss+xml",
-            "text/xml",
-            "application/atom+xml",
-            "application/x.atom+xml",
-            "application/x-atom+xml"
-        ]
-
-        for link in self.soup.find_all('link', type=valid_types):
-            url = link.get('href')
+        for url in _FEED_LINK_XPATH(self.tree):
             if url:
                 yield urljoin(base=self.clean_url(), url=url)
 
-    def find_internal_links(self):
+    def find_internal_links(self, limit=None):
         """Finds <a></a> tags to internal pages on the same domain that may have a feed.
 
         For example, this may find the homepage, or an index page.
+
+        Parameters
+        ----------
+        limit : int (optional)
+            Only return this many of the most likely links. Defaults to `None`, for all links.
+
+        Returns
+        -------
+        list
+            Urls of internal pages, most likely to have a feed first
         """
-        parsed_url = urlparse(self.clean_url())
-        parts = set(filter(None, parsed_url.path.split('/')))
-        possible_links = []
-        for link_node in self.soup.find_all('a', href=True):
-            link = link_node.get('href')
+        parsed_url = urlsplit(self.clean_url())
+        hostname = parsed_url.hostname
+        parts = frozenset(filter(None, parsed_url.path.split('/')))
+        # link -> (negated similarity, length, link): plain tuples sort best first, with no
+        # key function, and ties are broken by the link itself
+        ranks = {}
+        for link in self.hrefs:
             # Sometimes links without schemas are discovered -- this applies a default "http" schema to the discovered link
             if link.startswith('//'):
                 link = 'http:{}'.format(link)
-            parsed_link = urlparse(link)
+            # most absolute links are to other sites, and can be skipped without parsing them
+            if hostname and link.startswith(('http:', 'https:')) and hostname not in link.lower():
+                continue
+            parsed_link = urlsplit(link)
             if not parsed_link.hostname:
-                parsed_link = parsed_link._replace(netloc=parsed_url.hostname,
-                                                   scheme=parsed_url.scheme)
-                link = urlunparse(parsed_link)
-            if parsed_link.hostname == parsed_url.hostname:
-                might_be_feed = any(check(link) for check in (_is_feed_url, _might_be_feed_url))
-                link_parts = set(filter(None, parsed_link.path.split('/')))
-                similarity = len(parts.intersection(link_parts)) + might_be_feed * len(parts)
-                possible_links.append((link, similarity))
-        return [link for link, _ in sorted(set(possible_links), key=lambda j: (-j[1], len(j[0])))]
+                link = urlunsplit(parsed_link._replace(netloc=hostname, scheme=parsed_url.scheme))
+            elif parsed_link.hostname != hostname:
+                continue
+            if link in ranks:
+                continue
+            # `_is_feed_url` only matches urls that `_might_be_feed_url` also matches
+            similarity = len(parts.intersection(filter(None, parsed_link.path.split('/'))))
+            if _might_be_feed_url(link):
+                similarity += len(parts)
+            ranks[link] = -similarity, len(link), link
+
+        ranked = list(ranks.values())
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, ranked)
+        else:
+            ranked.sort()
+        return [link for _, _, link in ranked]
 
     def find_anchor_feeds(self):
         """Uses <a></a> tags to extract feeds
@@ -343,47 +1158,100 @@ class FeedSeeker(object):
         for example
             <a href="https://www.whatever.com/rss"></a>
         """
-        # This is outer loop so that most likely links
-        # are produced first
-        for url_filter in (_is_feed_url, _might_be_feed_url):
-            for link in self.soup.find_all('a', href=True):
-                url = link.get('href')
-                if url_filter(url):
-                    yield urljoin(base=self.clean_url(), url=url)
+        # Links are sorted in one pass, so that the most likely are produced first
+        likely, possible = [], []
+        for href in self.hrefs:
+            if _is_feed_url(href):
+                likely.append(href)
+            elif _might_be_feed_url(href):
+                possible.append(href)
+        for href in likely + possible:
+            yield urljoin(base=self.clean_url(), url=href)
 
     def guess_feed_links(self):
         """Iterates common locations to find feeds.  These urls probably do not exist, but might
 
-        Manual overrides should be added here.  For example, if foo.com has their rss feed at
-        foo.com/here/for/reasons.rss, add 'here/for/reasons.rss' to the suffixes.
+        Manual overrides should be added to `_FEED_SUFFIXES`.  For example, if foo.com has
+        their rss feed at foo.com/here/for/reasons.rss, add 'here/for/reasons.rss' there.
         """
-        suffixes = (
-            # Generic suffixes
-            'index.xml', 'atom.xml', 'feeds', 'feeds/default', 'feed', 'feed/default',
-            'feeds/posts/default/', '?feed=rss', '?feed=atom', '?feed=rss2', '?feed=rdf', 'rss',
-            'atom', 'rdf', 'index.rss', 'index.rdf', 'index.atom',
-            '?type=100',  # Typo3 RSS URL
-            '?format=feed&type=rss',  # Joomla RSS URL
-            'feeds/posts/default',  # Blogger.com RSS URL
-            'data/rss',  # LiveJournal RSS URL
-            'rss.xml',  # Posterous.com RSS feed
-            'articles.rss', 'articles.atom',  # Patch.com RSS feeds
-        )
-        for suffix in suffixes:
-            yield urljoin(base=self.clean_url(), url=suffix)
+        base = self.clean_url()
+        parsed = urlsplit(base)
+        if not (parsed.scheme and parsed.netloc) or '/.' in parsed.path or '//' in parsed.path:
+            # leave relative bases, dot segments and empty segments (which urljoin drops) to
+            # the general resolution in urljoin
+            for suffix in _FEED_SUFFIXES:
+                yield urljoin(base=base, url=suffix)
+            return
+
+        # Suffixes are all relative, so joining them just replaces either the query or the
+        # last path segment. Build both prefixes once instead of calling urljoin per suffix.
+        directory_path = parsed.path[:parsed.path.rfind('/') + 1] or '/'
+        page = urlunsplit(parsed._replace(fragment=''))
+        directory = urlunsplit(parsed._replace(path=directory_path, fragment=''))
+        for suffix in _FEED_SUFFIXES:
+            if suffix.startswith('?'):
+                yield page + suffix
+            else:
+                yield directory + suffix
+
+    def _live_guess_feed_links(self, seen=None, deadline=None, max_links=None):
+        """Like `guess_feed_links`, but without the guesses that do not exist
+
+        The guesses are checked with the head function in batches, rather than each being
+        fetched in turn, and their results are kept for checking them as feeds later. Each
+        batch is only as large as the links left under `max_links`, and guesses that are
+        ruled out still count towards it.
+
+        Parameters
+        ----------
+        seen : set (optional)
+            Urls that have already been checked, which are not guessed again. Guesses that
+            are ruled out are added to it.
+        deadline : float (optional)
+            `time.monotonic` time by which the default head function should give up
+        max_links : int (optional)
+            Maximum number of links to check, including those already in `seen`
+
+        Yields
+        ------
+            guessed urls that may be feeds, in the same order as `guess_feed_links`
+        """
+        if seen is None:
+            seen = set()
+        urls = [url for url in self.guess_feed_links() if url not in seen]
+        if self.head_function is None:
+            yield from urls
+            return
+
+        head_function = partial(self._head, deadline=deadline)
+        while urls:
+            # the link that reaches `max_links` is not checked, as in `_candidate_urls`
+            size = len(urls) if max_links is None else max_links - len(seen) - 1
+            if size <= 0:
+                return
+            batch, urls = urls[:size], urls[size:]
+            with ThreadPoolExecutor(max_workers=min(len(batch), _MAX_HEAD_WORKERS)) as executor:
+                heads = list(executor.map(head_function, batch))
+            for url, head in zip(batch, heads):
+                self._heads[url] = head
+                if _is_missing(head):
+                    seen.add(url)
+                else:
+                    yield url
 
     def find_feedly_feeds(self,
                           max_links : int = None,
-                          throttle : int = 5):
+                          throttle : int = 5,
+                          json_fetcher = None):
         """This is the class method for the find_feedly_feeds method below. Check out the
         description there for more information on how to use the method
         """
+        json_fetcher = json_fetcher or default_json_fetch_function
 
         search_url = "https://cloud.feedly.com/v3/search/feeds"
 
-        # Fetch current public suffix list and determine root domain of url
-        psl = publicsuffix.fetch()
-        ps = publicsuffix.PublicSuffixList(psl)
+        # Determine root domain of url from the current public suffix list
+        ps = _public_suffix_list()
         self.uri_root_domain = ps.get_public_suffix(self.url)
         self.uri_hostname = urlparse(self.url).hostname
         self.uri_domain_only = self.uri_root_domain.split('.', 1)[0]
@@ -393,16 +1261,21 @@ class FeedSeeker(object):
         found_feeds = set()     # Set of found feeds
         queries = [self.uri_hostname, self.uri_root_domain, self.uri_domain_only]
 
+        last_request = None     # `time.monotonic` time of the last search
         for url in queries:
             if url in checked_queries:
                 continue
+            # Throttle requests, counting the time spent on the last search and on the caller
+            # handling its results, and not sleeping after the final search
+            if last_request is not None:
+                time.sleep(max(0, last_request + throttle - time.monotonic()))
+            last_request = time.monotonic()
             params = {}
             params['query'] = url
             params['count'] = 500
-            response = requests.get(search_url,params=params)
-            if response.status_code == 200:
+            feeds = json_fetcher(search_url, params=params)
+            if feeds is not None:
                 checked_queries.add(url)
-                feeds = response.json()
                 for feed in feeds['results']:
                     url = feed['feedId'][5:]
                     hostname = urlparse(url).hostname
@@ -412,10 +1285,10 @@ class FeedSeeker(object):
                             found_hostnames.add(hostname)
                         if url not in found_feeds:
                             yield url
-            time.sleep(throttle) # Throttle requests
 
 
-def find_feed_url(url, html=None, spider=0, max_time=None, max_links=None):
+def find_feed_url(url, html=None, spider=0, max_time=None, max_links=None, max_workers=1,
+                  verify=True):
     """Find the single most likely feed url for a page.
 
     Parameters
@@ -427,12 +1300,20 @@ def find_feed_url(url, html=None, spider=0, max_time=None, max_links=None):
     spider : int (optional)
           How many times to restart the seeker on links with the same hostname on this page
     max_time : float (optional)
-          Give up after a certain amount of time. This is a lower limit, in that time
-          is checked *after* each request returns. Defaults to `None` for unlimited. Will
-          throw a TimeoutError if reached
+          Give up after a certain amount of time. Requests with the default functions
+          are cut short at it, while custom fetchers are only checked *after* each
+          request returns. Defaults to `None` for unlimited. Throws a TimeoutError when
+          the time is reached
     max_links : int (optional)
           Maximum links to check as feeds, to limit spidering complexity. Defaults to `None`,
           for unlimited.
+    max_workers : int (optional)
+          How many candidate urls to fetch at once. Defaults to 1, for fetching one at a
+          time. The fetcher must be thread-safe if this is larger.
+    verify : bool (optional)
+          Whether to fetch urls on the page ending in .rss, .rdf, .atom or .xml to check
+          that they are feeds. Defaults to True. If False, those urls are produced unchecked.
+          Guessed urls are always checked.
 
 
     Returns
@@ -440,11 +1321,13 @@ def find_feed_url(url, html=None, spider=0, max_time=None, max_links=None):
     str or None
        A url pointing to the most likely feed, if it exists.
     """
-    with timeout(max_time):
-        return FeedSeeker(url, html).find_feed_url(spider=spider, max_links=max_links)
+    return FeedSeeker(url, html).find_feed_url(spider=spider, max_links=max_links,
+                                               max_time=max_time, max_workers=max_workers,
+                                               verify=verify)
 
 
-def generate_feed_urls(url, html=None, spider=0, max_time=None, max_links=None, fetcher=None):
+def generate_feed_urls(url, html=None, spider=0, max_time=None, max_links=None, fetcher=None,
+                       max_workers=1, verify=True):
     """Find all feed urls for a page.
 
     Parameters
@@ -456,28 +1339,38 @@ def generate_feed_urls(url, html=None, spider=0, max_time=None, max_links=None,
     spider : int (optional)
           How many times to restart the seeker on links with the same hostname on this page
     max_time : float (optional)
-          Give up after a certain amount of time. This is a lower limit, in that time
-          is checked *after* each request returns. Defaults to `None` for unlimited. Throws
-          a TimeoutError when the time is reached
+          Give up after a certain amount of time. Requests with the default functions
+          are cut short at it, while custom fetchers are only checked *after* each
+          request returns. Defaults to `None` for unlimited. Throws a TimeoutError when
+          the time is reached
     max_links : int (optional)
           Maximum links to check as feeds, to limit spidering complexity. Defaults to `None`,
           for unlimited.
     fetcher : function (optional)
-          A function that accepts a url and returns text. See `default_fetch_function`
-          for how to write a custom fetcher.
+          A function that accepts a url and returns text or bytes. See
+          `default_fetch_function` for how to write a custom fetcher.
+    max_workers : int (optional)
+          How many candidate urls to fetch at once. Defaults to 1, for fetching one at a
+          time. The fetcher must be thread-safe if this is larger.
+    verify : bool (optional)
+          Whether to fetch urls on the page ending in .rss, .rdf, .atom or .xml to check
+          that they are feeds. Defaults to True. If False, those urls are produced unchecked.
+          Guessed urls are always checked.
 
     Yields
     ------
     str or None
        A url pointing to a feed associated with the page
     """
-    with timeout(max_time):
-        for feed in FeedSeeker(url, html, fetcher).generate_feed_urls(spider=spider, max_links=max_links):
-            yield feed
+    seeker = FeedSeeker(url, html, fetcher)
+    for feed in seeker.generate_feed_urls(spider=spider, max_links=max_links, max_time=max_time,
+                                          max_workers=max_workers, verify=verify):
+        yield feed
 
 def find_feedly_feeds(url:str,
                       max_links : int = None,
-                      throttle : int = 5) -> Iterable[str]:
+                      throttle : int = 5,
+                      json_fetcher = None) -> Iterable[str]:
     """Use feedly to discover feeds
     There are a few gotchas here. Sometimes searching with the top level domain
     attached doesn't yield as many results (e.g. washingtonpost.com) -- however,
@@ -485,7 +1378,11 @@ def find_feedly_feeds(url:str,
     Also, an API Key is not required for this endpoint. However, occasionally a
     403 response is returned which may be from an internal undocumented throttle
     or other issues. The default throttle between requests is 5 seconds and can be
-    set using the throttle parameter.
+    set using the throttle parameter. Searches go through `json_fetcher`, a function that
+    accepts a url and query arguments and returns decoded JSON or None, defaulting to
+    `default_json_fetch_function`.
     """
-    for feed in FeedSeeker(url).find_feedly_feeds(max_links=max_links,throttle=throttle):
+    feeds = FeedSeeker(url).find_feedly_feeds(max_links=max_links, throttle=throttle,
+                                              json_fetcher=json_fetcher)
+    for feed in feeds:
         yield feed
@@ -1,6 +1,10 @@
+import socket
+import threading
 import time
+from urllib.parse import urljoin
 
 import pytest
+import requests
 import responses
 
 from feed_seeker import feed_seeker
@@ -10,12 +14,67 @@ def test__is_feed_url():
     assert not feed_seeker._is_feed_url('nytimes.com')
     assert feed_seeker._is_feed_url('nytimes.rss')
     assert not feed_seeker._is_feed_url('rssnews.com')
+    assert feed_seeker._is_feed_url('NYTIMES.RSS')
+    assert not feed_seeker._is_feed_url('nytimes.rss/')
 
 
 def test__might_be_feed_url():
     assert not feed_seeker._might_be_feed_url('nytimes.com')
     assert feed_seeker._might_be_feed_url('nytimes.rss')
     assert feed_seeker._might_be_feed_url('rssnews.com')
+    assert feed_seeker._might_be_feed_url('nytimes.com/Feeds')
+
+
+def test__sniff_is_feed():
+    assert feed_seeker._sniff_is_feed('<?xml version="1.0"?> <rss version="2.0"></rss>')
+    assert feed_seeker._sniff_is_feed(b'<!-- generated --><feed xmlns="x"></feed>')
+    assert feed_seeker._sniff_is_feed(b'<!DOCTYPE html><html><body></body></html>') is False
+    assert feed_seeker._sniff_is_feed('<head><title>hi</title></head>') is False
+    # inconclusive documents are left to the parser
+    assert feed_seeker._sniff_is_feed('') is None
+    assert feed_seeker._sniff_is_feed('<div><rss></rss></div>') is None
+    assert feed_seeker._sniff_is_feed('<rss><head></head></rss>') is None
+    # the first tag is also found past a long preamble
+    preamble = '<!-- {} -->'.format('x' * 4096)
+    assert feed_seeker._sniff_is_feed(preamble + '<feed xmlns="x"></feed>')
+    assert feed_seeker._sniff_is_feed(preamble + '<html></html>') is False
+    assert feed_seeker._sniff_is_feed(preamble + '<div></div>') is None
+
+
+@responses.activate
+def test_default_fetch_function():
+    url = 'http://nopenopenope.nope'
+    responses.add(responses.GET, url, body='<html></html>', status=200)
+    assert feed_seeker.default_fetch_function(url) == b'<html></html>'
+
+    # errors and slow servers give an empty page rather than raising
+    responses.add(responses.GET, url + '/missing', status=404)
+    assert feed_seeker.default_fetch_function(url + '/missing') == b''
+    responses.add(responses.GET, url + '/slow', body=requests.Timeout())
+    assert feed_seeker.default_fetch_function(url + '/slow') == b''
+
+    # large responses are cut off
+    responses.add(responses.GET, url + '/large', body=b'x' * 1000)
+    assert feed_seeker.default_fetch_function(url + '/large', max_bytes=100) == b'x' * 100
+
+
+@responses.activate
+def test_default_fetch_and_probe():
+    url = 'http://nopenopenope.nope'
+    responses.add(responses.GET, url + '/feed', body='<?xml version="1.0"?><rss><channel>')
+    assert feed_seeker.default_fetch_and_probe(url + '/feed') == (True, None)
+    responses.add(responses.GET, url + '/rdf',
+                  body='<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">')
+    assert feed_seeker.default_fetch_and_probe(url + '/rdf') == (True, None)
+    responses.add(responses.GET, url + '/page', body='<!DOCTYPE html><html><body>')
+    assert feed_seeker.default_fetch_and_probe(url + '/page') == (False, None)
+    responses.add(responses.GET, url + '/missing', status=404)
+    assert feed_seeker.default_fetch_and_probe(url + '/missing') == (False, None)
+
+    # undecided documents are read in full
+    body = b'<div><rss></rss></div>'
+    responses.add(responses.GET, url + '/div', body=body)
+    assert feed_seeker.default_fetch_and_probe(url + '/div') == (None, body)
 
 
 @responses.activate
@@ -42,6 +101,50 @@ def test_find_feed_max_time():
     feed_seeker.find_feed_url(url, max_time=max_time)
 
 
+def test_find_feed_max_time_unresponsive_server():
+    # the server accepts connections but never replies, so the request itself must time out
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    url = 'http://127.0.0.1:{}'.format(server.getsockname()[1])
+    max_time = 0.5
+    start = time.monotonic()
+    try:
+        with pytest.raises(TimeoutError):
+            feed_seeker.find_feed_url(url, max_time=max_time)
+    finally:
+        server.close()
+    assert time.monotonic() - start < 4 * max_time
+
+    # the server sends its body a byte at a time, so no single read times out
+    def trickle(server):
+        connection, _ = server.accept()
+        with connection:
+            connection.recv(65536)
+            connection.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n'
+                               b'Content-Length: 1000\r\n\r\n')
+            try:
+                for _ in range(1000):
+                    connection.sendall(b' ')
+                    time.sleep(0.1)
+            except OSError:     # the client gave up
+                pass
+
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    thread = threading.Thread(target=trickle, args=(server,), daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:{}'.format(server.getsockname()[1])
+    start = time.monotonic()
+    try:
+        with pytest.raises(TimeoutError):
+            feed_seeker.find_feed_url(url, max_time=max_time)
+    finally:
+        server.close()
+    assert time.monotonic() - start < 4 * max_time
+
+
 @responses.activate
 def test_generate_feeds_max_time():
     max_time = 0.5
@@ -79,17 +182,52 @@ def test_generate_feeds_max_time():
     list(feed_seeker.generate_feed_urls(url, max_time=max_time))
 
 
+@responses.activate
+def test_find_feedly_feeds(monkeypatch):
+    monkeypatch.setattr(feed_seeker, '_PUBLIC_SUFFIX_LIST',
+                        feed_seeker.publicsuffix.PublicSuffixList(['com']))
+    results = {'results': [{'feedId': 'feed/http://www.nytimes.com/rss'}]}
+    responses.add(responses.GET, 'https://cloud.feedly.com/v3/search/feeds', json=results)
+
+    throttle = 0.2
+    start = time.monotonic()
+    feeds = list(feed_seeker.find_feedly_feeds('http://www.nytimes.com', throttle=throttle))
+    elapsed = time.monotonic() - start
+    # hostname, root domain and bare domain are searched, with no wait after the last one
+    assert len(responses.calls) == 3
+    assert set(feeds) == {'http://www.nytimes.com/rss'}
+    assert 2 * throttle <= elapsed < 3 * throttle
+
+    # searches can go through a custom function
+    queries = []
+
+    def json_fetcher(url, params=None):
+        queries.append(params['query'])
+        return None if params['query'] == 'nytimes.com' else results
+
+    feeds = list(feed_seeker.find_feedly_feeds('http://www.nytimes.com', throttle=0,
+                                               json_fetcher=json_fetcher))
+    assert queries == ['www.nytimes.com', 'nytimes.com', 'nytimes']
+    assert set(feeds) == {'http://www.nytimes.com/rss'}
+
+
 class TestFeedSeeker(object):
-    def setup_method(self):
+    @classmethod
+    def setup_class(cls):
+        # patching requests once for the class is enough, as long as each test resets it
         responses.start()
 
+    @classmethod
+    def teardown_class(cls):
+        responses.stop()
+
+    def setup_method(self):
         self.base_url = 'http://nopenopenope.nope'
         self.regular_html_template = "<html><head>{head}</head><body>{body}</body></html>"
         self.rss_feed_template = '<link type="application/rss+xml" href="{}" />'
         self.regular_feed_page = '<?xml version="1.0"?> <rss version="2.0"></rss>'
 
     def teardown_method(self):
-        responses.stop()
         responses.reset()
 
     def test_is_feed(self):
@@ -98,11 +236,39 @@ class TestFeedSeeker(object):
         finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
         assert not finder.is_feed()
 
+    def test_is_feed_parsed(self):
+        # documents that the first tag does not settle are parsed
+        finder = feed_seeker.FeedSeeker(self.base_url, html='<div></div><rss></rss>')
+        assert finder.is_feed()
+        finder = feed_seeker.FeedSeeker(self.base_url, html='<rss><head></head></rss>')
+        assert finder.is_feed()
+        finder = feed_seeker.FeedSeeker(self.base_url, html='<title>t</title><rss></rss>')
+        assert not finder.is_feed()
+        finder = feed_seeker.FeedSeeker(self.base_url, html='')
+        assert not finder.is_feed()
+
+    def test_is_feed_rss_1(self):
+        # RSS 1.0 feeds have a namespaced <rdf:RDF> root
+        rdf = '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"></rdf:RDF>'
+        finder = feed_seeker.FeedSeeker(self.base_url, html='<?xml version="1.0"?>' + rdf)
+        assert finder.is_feed()
+        finder = feed_seeker.FeedSeeker(self.base_url, html='<div></div>' + rdf)
+        assert finder.is_feed()
+
     def test_html_property(self):
         responses.add(responses.GET, self.base_url, body=self.regular_html_template, status=200)
         finder = feed_seeker.FeedSeeker(self.base_url)
         found_html = finder.html
-        assert found_html == self.regular_html_template
+        assert found_html == self.regular_html_template.encode()
+
+    def test_html_header_charset(self):
+        # the charset is only given in the Content-Type header, not in the page
+        html = self.regular_html_template.format(head='', body='<a href="/новости.rss"></a>')
+        responses.add(responses.GET, self.base_url, body=html.encode('utf-8'),
+                      content_type='text/html; charset=utf-8')
+        finder = feed_seeker.FeedSeeker(self.base_url)
+        assert finder.html == html
+        assert list(finder.find_anchor_feeds()) == [self.base_url + '/новости.rss']
 
     def generate_responses(self):
         feeds = (
@@ -184,6 +350,16 @@ class TestFeedSeeker(object):
 
         assert len(found_feeds) == len(feeds)
 
+    def test_generate_feed_urls_no_verify(self):
+        body = '<a href="/news.rss"></a><a href="/missing.rss"></a>'
+        html = self.regular_html_template.format(head='', body=body)
+        finder = feed_seeker.FeedSeeker(self.base_url, html=html)
+        # urls that end like feeds are produced without being requested
+        found_feeds = finder.generate_feed_urls(verify=False)
+        assert [next(found_feeds), next(found_feeds)] == [
+            self.base_url + '/news.rss', self.base_url + '/missing.rss']
+        assert len(responses.calls) == 0
+
     def test_generate_feed_urls_not_a_page(self):
         feeds, _ = self.generate_responses()
 
@@ -206,6 +382,22 @@ class TestFeedSeeker(object):
         url = feed_seeker.find_feed_url(self.base_url)
         assert url == self.base_url + feeds[0]
 
+    def test_generate_feed_urls_resumes(self):
+        feeds, _ = self.generate_responses()
+        finder = feed_seeker.FeedSeeker(self.base_url)
+        assert finder.find_feed_url() == self.base_url + feeds[0]
+        num_calls = len(responses.calls)
+
+        # the first feed is not fetched again, and the search carries on from it
+        found_feeds = list(finder.generate_feed_urls())
+        assert len(found_feeds) == len(feeds)
+        assert found_feeds[0] == self.base_url + feeds[0]
+        assert self.base_url + feeds[0] not in [
+            call.request.url for call in responses.calls[num_calls:]]
+        num_calls = len(responses.calls)
+        assert list(finder.generate_feed_urls()) == found_feeds
+        assert len(responses.calls) == num_calls
+
     def test_find_link_feeds(self):
         num_feeds = 4
         feed_urls = []
@@ -233,12 +425,34 @@ class TestFeedSeeker(object):
         assert len(list(finder.find_link_feeds())) == 0
         assert len(set(finder.find_anchor_feeds())) == num_feeds
 
+        # repeated anchors are only produced once
+        html = self.regular_html_template.format(head='', body='\n'.join(feed_urls * 3))
+        finder = feed_seeker.FeedSeeker(self.base_url, html=html)
+        assert len(list(finder.find_anchor_feeds())) == num_feeds
+        assert len(finder.hrefs) == num_feeds + 1
+
     def test_find_internal_links(self):
         self.generate_responses()
         finder = feed_seeker.FeedSeeker(self.base_url, html=None)
         internal_links = finder.find_internal_links()
         assert len(internal_links) == 1  # from `self.generate_responses`
 
+    def test_find_internal_links_order(self):
+        anchors = ('/about', '/news/sports', 'http://elsewhere.com/news/rss', '/rss',
+                   '/news/sports', '//nopenopenope.nope/news',
+                   'http://elsewhere.com/?next=nopenopenope.nope')
+        html = self.regular_html_template.format(
+            head='', body=''.join('<a href="{}"></a>'.format(anchor) for anchor in anchors))
+        finder = feed_seeker.FeedSeeker(self.base_url + '/news/world', html=html)
+        # feed-like links first, then by path similarity, then shortest
+        assert finder.find_internal_links() == [
+            self.base_url + '/rss',
+            'http://nopenopenope.nope/news',
+            self.base_url + '/news/sports',
+            self.base_url + '/about',
+        ]
+        assert finder.find_internal_links(limit=2) == finder.find_internal_links()[:2]
+
     def test_guess_feed_links(self):
         # even empty page has some guesses
         finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
@@ -247,6 +461,82 @@ class TestFeedSeeker(object):
         for feed_link in guessed_links:
             assert self.base_url in feed_link
 
+    def test_guess_feed_links_matches_urljoin(self):
+        # guesses are built by concatenation, which must agree with urljoin
+        bases = ('http://a.com', 'http://a.com/', 'http://a.com/news', 'http://a.com/news/',
+                 'http://a.com/news/world?page=2#top', 'http://a.com/a/./b/../c', 'a.com/news',
+                 'http://a.com/~u//', 'http://a.com//news')
+        for base in bases:
+            finder = feed_seeker.FeedSeeker(base, html='')
+            expected = [urljoin(finder.clean_url(), suffix)
+                        for suffix in feed_seeker._FEED_SUFFIXES]
+            assert list(finder.guess_feed_links()) == expected
+
+    def test_url_is_feed_head(self):
+        finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
+        responses.add(responses.HEAD, self.base_url + '/missing', status=404)
+        responses.add(responses.HEAD, self.base_url + '/feed', status=200,
+                      content_type='application/rss+xml')
+        responses.add(responses.HEAD, self.base_url + '/page', status=200,
+                      content_type='text/html')
+        responses.add(responses.GET, self.base_url + '/page', body=self.regular_feed_page)
+        responses.add(responses.HEAD, self.base_url + '/rss.png', status=200,
+                      content_type='image/png')
+
+        assert not finder._url_is_feed(self.base_url + '/missing')
+        assert finder._url_is_feed(self.base_url + '/feed')
+        assert finder._url_is_feed(self.base_url + '/page')
+        assert not finder._url_is_feed(self.base_url + '/rss.png')
+        # only the url whose headers were not conclusive was downloaded
+        methods = [call.request.method for call in responses.calls]
+        assert methods == ['HEAD', 'HEAD', 'HEAD', 'GET', 'HEAD']
+
+    def test_url_is_feed_head_not_supported(self):
+        # servers without HEAD support answer 501, so the url is fetched instead
+        html = self.regular_html_template.format(
+            head=self.rss_feed_template.format('/feed.rss'), body='')
+        responses.add(responses.GET, self.base_url, body=html)
+        responses.add(responses.HEAD, self.base_url + '/feed.rss', status=501)
+        responses.add(responses.GET, self.base_url + '/feed.rss', body=self.regular_feed_page)
+        finder = feed_seeker.FeedSeeker(self.base_url)
+        assert finder._url_is_feed(self.base_url + '/feed.rss')
+        assert feed_seeker.find_feed_url(self.base_url) == self.base_url + '/feed.rss'
+
+    def test_url_is_feed_spidering(self):
+        # only pages on the same host can be spidered onto, so only they are kept
+        finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
+        responses.add(responses.GET, self.base_url + '/page', body=self.regular_html_template)
+        responses.add(responses.GET, 'http://elsewhere.nope/page',
+                      body=self.regular_html_template)
+        seekers = {}
+        assert not finder._url_is_feed(self.base_url + '/page', seekers=seekers)
+        assert not finder._url_is_feed('http://elsewhere.nope/page', seekers=seekers)
+        assert list(seekers) == [self.base_url + '/page']
+        assert seekers[self.base_url + '/page'].html == self.regular_html_template.encode()
+
+    def test_live_guess_feed_links(self):
+        finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
+        guessed_links = list(finder.guess_feed_links())
+        for feed_link in guessed_links[1:]:
+            responses.add(responses.HEAD, feed_link, status=404)
+        # the first guess has no HEAD response registered, so is kept to be fetched
+        assert list(finder._live_guess_feed_links()) == guessed_links[:1]
+        assert list(finder._live_guess_feed_links(seen=set(guessed_links[:1]))) == []
+
+    def test_live_guess_feed_links_max_links(self):
+        # guesses are only asked about while there are links left to check
+        responses.add(responses.GET, self.base_url, body=self.regular_html_template)
+        finder = feed_seeker.FeedSeeker(self.base_url)
+        for feed_link in finder.guess_feed_links():
+            responses.add(responses.HEAD, feed_link, status=404)
+        assert list(finder.generate_feed_urls(max_links=1)) == []
+        assert len(responses.calls) == 1
+
+        # guesses that are ruled out count towards `max_links`
+        finder = feed_seeker.FeedSeeker(self.base_url)
+        assert list(finder.generate_feed_urls(max_links=4)) == []
+        assert [call.request.method for call in responses.calls[1:]] == ['GET'] + ['HEAD'] * 3
+
     def test_empty_page(self):
         finder = feed_seeker.FeedSeeker(self.base_url, html=self.regular_html_template)
         # Page has no links, so should fail
@@ -306,3 +596,140 @@ class TestFetcherFunction(object):
             return self.regular_feed_page
         feed_urls = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher))
         assert self.feeds_fetched > 1 and len(feed_urls) == self.feeds_fetched
+
+    def test_generate_fetcher_no_verify(self):
+        # guessed urls are still checked, so a page without feeds gives none
+        def fetcher(url):
+            return self.html_page
+        feed_urls = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher,
+                                                        verify=False))
+        assert feed_urls == []
+        assert feed_seeker.FeedSeeker(self.base_url, fetcher=fetcher).find_feed_url(
+            verify=False) is None
+
+    def test_generate_fetcher_max_workers(self):
+        lock = threading.Lock()
+        self.active, self.most_active = 0, 0
+        def fetcher(url):
+            if url == self.base_url:
+                return self.html_page
+            with lock:
+                self.active += 1
+                self.most_active = max(self.most_active, self.active)
+            time.sleep(0.01)
+            with lock:
+                self.active -= 1
+            return self.regular_feed_page
+
+        sequential = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher))
+        assert self.most_active == 1
+
+        concurrent = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher,
+                                                         max_workers=4))
+        # same feeds, in the same order, but fetched alongside each other
+        assert concurrent == sequential
+        assert 1 < self.most_active <= 4
+
+    def test_generate_fetcher_max_workers_stop(self):
+        # searches fetching in threads are not kept, so their workers stop with them
+        def fetcher(url):
+            if url == self.base_url:
+                return self.html_page
+            return self.regular_feed_page
+
+        num_threads = threading.active_count()
+        finder = feed_seeker.FeedSeeker(self.base_url, fetcher=fetcher)
+        assert finder.find_feed_url(max_workers=8) is not None
+        deadline = time.monotonic() + 1
+        while threading.active_count() > num_threads and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert threading.active_count() == num_threads
+
+    def test_generate_fetcher_error_not_kept(self):
+        # a search that raised is started over, rather than ending at the error
+        self.fail = True
+        def fetcher(url):
+            if url == self.base_url:
+                return self.html_page
+            if self.fail and url.endswith('/atom.xml'):
+                raise ValueError('fetch failed')
+            return self.regular_feed_page
+
+        finder = feed_seeker.FeedSeeker(self.base_url, fetcher=fetcher)
+        with pytest.raises(ValueError):
+            list(finder.generate_feed_urls())
+        self.fail = False
+        expected = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher))
+        assert len(expected) > 2
+        assert list(finder.generate_feed_urls()) == expected
+
+    def test_generate_fetcher_max_time_in_thread(self):
+        # timeouts do not rely on signals, so also work away from the main thread
+        def fetcher(url):
+            time.sleep(0.05)
+            if url == self.base_url:
+                return self.html_page
+            return self.regular_feed_page
+
+        errors = []
+        def run():
+            try:
+                list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher, max_time=0.1))
+            except TimeoutError as error:
+                errors.append(error)
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+
+    def test_spider_max_workers(self):
+        pages = ('/a', '/b', '/c')
+        def fetcher(url):
+            path = url[len(self.base_url):]
+            if path == '':
+                anchors = ''.join('<a href="{}"></a>'.format(page) for page in pages)
+                return '<html><head></head><body>{}</body></html>'.format(anchors)
+            if path in pages:
+                time.sleep(0.01)
+                return '<html><head><link type="application/rss+xml" href="{}.rss">'.format(path)
+            if path[:-len('.rss')] in pages:
+                return self.regular_feed_page
+            return ''
+
+        sequential = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher,
+                                                         spider=1))
+        concurrent = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher,
+                                                         spider=1, max_workers=4))
+        # spidered pages are fetched ahead, but feeds come in the same order
+        assert sequential == [self.base_url + page + '.rss' for page in pages]
+        assert concurrent == sequential
+
+    def test_spider_max_links_skips_failed_pages(self):
+        # /a and /b fail, so use up none of `max_links`, and /ccc is still spidered onto
+        def fetcher(url):
+            path = url[len(self.base_url):]
+            if path == '':
+                anchors = ''.join('<a href="{}"></a>'.format(page) for page in ('/a', '/b', '/ccc'))
+                return '<html><head></head><body>{}</body></html>'.format(anchors)
+            if path == '/ccc':
+                return '<html><head><link type="application/rss+xml" href="/c.rss">'
+            if path == '/c.rss':
+                return self.regular_feed_page
+            return ''
+
+        num_guesses = len(feed_seeker._FEED_SUFFIXES)
+        feed_urls = list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher, spider=1,
+                                                        max_links=num_guesses + 2))
+        assert feed_urls == [self.base_url + '/c.rss']
+
+    def test_spider_fetches_once(self):
+        # /feed.html is checked as a candidate feed, and then spidered onto
+        fetched = []
+        def fetcher(url):
+            fetched.append(url)
+            if url == self.base_url:
+                return '<html><head></head><body><a href="/feed.html"></a></body></html>'
+            return self.html_page
+
+        list(feed_seeker.generate_feed_urls(self.base_url, fetcher=fetcher, spider=1))
+        assert fetched.count(self.base_url + '/feed.html') == 1